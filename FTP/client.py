@@ -16,8 +16,6 @@ CLIENT_FILE_DIR = os.path.join(os.path.dirname(__file__), 'client_files')
 SERVER_IP = '3.101.117.119'
 SERVER_PORT = 5000
 
-VALID_COMMANDS = ["LS", "GET", "PUT", "QUIT"]
-
 
 def get_file_path(filename):
     """Get full path to file in client directory"""
@@ -41,7 +39,7 @@ def parse_input(user_input):
     return command, filename
 
 
-def handle_ls(client):
+def handle_ls(client, filename=None):
     """Handle LS command - list files on server"""
     # Send command
     protocol.send_message(client, {
@@ -136,7 +134,7 @@ def handle_put(client, filename):
     return True
 
 
-def handle_quit(client):
+def handle_quit(client, filename=None):
     """Handle QUIT command - disconnect from server"""
     protocol.send_message(client, {
         "type": "command",
@@ -151,10 +149,20 @@ def handle_quit(client):
     return False
 
 
+# Command dispatch table; each handler returns False when the session should end
+HANDLERS = {
+    "LS": handle_ls,
+    "GET": handle_get,
+    "PUT": handle_put,
+    "QUIT": handle_quit
+}
+
+
 def main():
     """Main client loop"""
     # Connect to server
-    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client = protocol.BufferedSocket(socket.socket(socket.AF_INET, socket.SOCK_STREAM))
+    protocol.configure_socket(client)
 
     try:
         client.connect((SERVER_IP, SERVER_PORT))
@@ -182,25 +190,14 @@ def main():
                     continue
 
                 # Execute command
-                if command == "LS":
-                    if not handle_ls(client):
-                        break
-
-                elif command == "GET":
-                    if not handle_get(client, filename):
-                        break
-
-                elif command == "PUT":
-                    if not handle_put(client, filename):
-                        break
-
-                elif command == "QUIT":
-                    handle_quit(client)
-                    break
-
-                else:
+                handler = HANDLERS.get(command)
+                if handler is None:
                     print(f"Unknown command: {command}")
                     print("Available commands: LS, GET <file>, PUT <file>, QUIT")
+                    continue
+
+                if not handler(client, filename):
+                    break
 
             except KeyboardInterrupt:
                 print("\nInterrupted. Use QUIT to disconnect properly.")
@@ -6,116 +6,444 @@ Message Format:
 - N bytes: JSON payload (UTF-8 encoded)
 
 Message Types:
-- command: Client sends command to server
+- command: Client sends command to server (command names are upper-case:
+  LS, GET, PUT, QUIT)
 - response: Server responds to command
-- file_transfer_start: Metadata before file transfer
-- file_transfer_complete: Signal file transfer is done
+- file_transfer_start: Metadata before file transfer (the "size" field
+  tells the receiver exactly how many raw bytes follow, so no completion
+  message is needed)
 """
 
 import json
+import mmap
+import socket
+import stat
 import struct
+import threading
 import os
 
+try:
+    import orjson  # Optional: faster JSON encoding/decoding (pip install orjson)
+except ImportError:
+    orjson = None
 
-def send_message(sock, message_dict):
+if orjson:
+    encode_json = orjson.dumps   # Returns UTF-8 bytes directly
+    decode_json = orjson.loads   # Accepts bytes/bytearray/memoryview directly
+else:
+    # Compact separators (no spaces) like orjson; a prebuilt encoder skips
+    # the per-call setup json.dumps does for non-default options
+    json_encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def encode_json(obj):
+        """Encode an object as UTF-8 JSON bytes"""
+        return json_encoder.encode(obj).encode('utf-8')
+
+    def decode_json(data):
+        """Decode UTF-8 JSON bytes (or any buffer) into an object"""
+        return json.loads(str(data, 'utf-8'))
+
+HEADER = struct.Struct('!I')   # 4-byte big-endian unsigned int length prefix
+CHUNK_SIZE = 64 * 1024         # Bytes moved per file read/recv call
+SOCKET_BUFFER_SIZE = 1 << 20   # Kernel send/receive buffer size (1 MiB)
+
+# One copy-loop buffer per thread: transfers run on a bounded set of worker
+# threads, so this reuses memory across connections without costing
+# anything for idle ones
+transfer_buffers = threading.local()
+
+# Ask the kernel to fill the whole buffer before returning, so a read
+# normally takes one recv syscall instead of one per arriving segment
+RECV_FLAGS = getattr(socket, 'MSG_WAITALL', 0)
+
+# Receive without waiting even on a blocking socket (not on Windows)
+DONTWAIT_FLAGS = getattr(socket, 'MSG_DONTWAIT', 0)
+
+TEMP_SUFFIX = '.part'          # Suffix of files still being received
+
+# Files at least this large are streamed through once, so their pages are
+# dropped from the page cache after sending instead of evicting hot files
+NOCACHE_SIZE = 64 << 20
+
+# Linux: hold a send back briefly so it shares a segment with the data
+# that follows (the next send without the flag pushes everything out)
+SEND_MORE = getattr(socket, 'MSG_MORE', 0)
+
+
+def configure_socket(sock):
     """
-    Send a length-prefixed JSON message
+    Apply the socket options used on every FTP connection
+
+    Args:
+        sock: Socket connection (or listening socket, so accepted sockets inherit them)
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Don't hold back small messages (Nagle)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+
+
+class BufferedSocket:
+    """
+    Socket wrapper with a persistent read buffer
+
+    Each recv fills as much of the buffer as the kernel has ready, so one
+    syscall often brings in several pipelined messages (or a header and its
+    payload together); recv_message() then parses them straight out of the
+    buffer. The server's event loop uses drain()/has_message() to collect a
+    whole command before dispatching it. Everything else is passed to the
+    socket, so the other helpers work on a BufferedSocket unchanged.
+    """
+
+    def __init__(self, sock, size=CHUNK_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.read_pos = 0    # Start of unconsumed data
+        self.write_pos = 0   # End of unconsumed data
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def fill(self, flags=0):
+        """
+        Read the data that has already arrived (a single recv call)
+
+        Args:
+            flags: Flags for the recv call
+
+        Returns:
+            Number of bytes read, 0 if connection closed
+        """
+        if self.read_pos == self.write_pos:
+            self.read_pos = self.write_pos = 0
+        elif self.write_pos == len(self.buffer):
+            self.make_room()
+        nread = self.sock.recv_into(self.view[self.write_pos:], 0, flags)
+        self.write_pos += nread
+        return nread
+
+    def drain(self):
+        """
+        Read until a whole message is buffered or no more data has arrived
+
+        Call when the socket is readable: the first recv returns at once,
+        and later ones don't wait, so a message that arrived in more
+        segments than the free space holds is collected in one wakeup.
+
+        Returns:
+            Number of bytes read, 0 if connection closed
+        """
+        total = nread = self.fill()
+        # A recv that filled all the free space may have left more behind
+        while (nread and DONTWAIT_FLAGS and self.write_pos == len(self.buffer)
+               and not self.has_message()):
+            try:
+                nread = self.fill(DONTWAIT_FLAGS)
+            except BlockingIOError:
+                break
+            total += nread
+        return total
+
+    def make_room(self):
+        """Move unconsumed data to the front, growing the buffer if it is full"""
+        pending = self.buffer[self.read_pos:self.write_pos]
+        if self.read_pos == 0:
+            self.buffer = bytearray(2 * len(self.buffer))  # One message fills it
+            self.view = memoryview(self.buffer)
+        self.buffer[:len(pending)] = pending
+        self.read_pos, self.write_pos = 0, len(pending)
+
+    def has_message(self):
+        """Check whether a complete length-prefixed message is buffered"""
+        available = self.write_pos - self.read_pos
+        if available < HEADER.size:
+            return False
+        length = HEADER.unpack_from(self.buffer, self.read_pos)[0]
+        return available >= HEADER.size + length
+
+    def take_message(self):
+        """
+        Remove the next complete message from the buffer (see has_message)
+
+        Returns:
+            Memoryview of the JSON payload
+        """
+        length = HEADER.unpack_from(self.buffer, self.read_pos)[0]
+        start = self.read_pos + HEADER.size
+        self.read_pos = start + length
+        return self.view[start:self.read_pos]
+
+    def recv_into(self, buffer, nbytes=0, flags=0):
+        """Receive into buffer, serving read-ahead bytes before the socket"""
+        available = self.write_pos - self.read_pos
+        if not available:
+            return self.sock.recv_into(buffer, nbytes, flags)
+        n = min(available, nbytes or len(buffer), len(buffer))
+        buffer[:n] = self.view[self.read_pos:self.read_pos + n]
+        self.read_pos += n
+        return n
+
+
+def encode_message(message_dict):
+    """
+    Encode a message as it goes on the wire
 
     Args:
-        sock: Socket connection
         message_dict: Dictionary to send as JSON
+
+    Returns:
+        Bytes of the length header followed by the JSON payload
     """
-    payload = json.dumps(message_dict).encode('utf-8')
-    length = struct.pack('!I', len(payload))  # 4-byte big-endian unsigned int
-    sock.sendall(length + payload)
+    payload = encode_json(message_dict)
+    return HEADER.pack(len(payload)) + payload
 
 
-def recv_message(sock):
+def get_transfer_buffer(size):
     """
-    Receive a length-prefixed JSON message
+    Get this thread's reusable copy-loop buffer
 
     Args:
-        sock: Socket connection
+        size: Minimum buffer size in bytes
 
     Returns:
-        Dictionary parsed from JSON, or None if connection closed
+        Writable memoryview of at least size bytes
     """
-    # Read 4-byte length header
-    length_data = recv_exact(sock, 4)
-    if not length_data:
-        return None
+    buf = getattr(transfer_buffers, 'view', None)
+    if buf is None or len(buf) < size:
+        buf = transfer_buffers.view = memoryview(bytearray(size))
+    return buf
 
-    length = struct.unpack('!I', length_data)[0]
 
-    # Read the JSON payload
-    payload = recv_exact(sock, length)
-    if not payload:
-        return None
+def send_message(sock, message_dict):
+    """
+    Send a length-prefixed JSON message
 
-    return json.loads(payload.decode('utf-8'))
+    Args:
+        sock: Socket connection
+        message_dict: Dictionary to send as JSON
+    """
+    sock.sendall(encode_message(message_dict))
 
 
-def recv_exact(sock, n):
+def send_buffers(sock, buffers, flags=0):
     """
-    Helper to receive exactly n bytes from socket
+    Send several buffers with as few syscalls as possible (scatter-gather)
 
     Args:
         sock: Socket connection
-        n: Number of bytes to receive
+        buffers: List of bytes-like objects to send in order
+        flags: Flags for the send calls (e.g. SEND_MORE)
+    """
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers), flags)  # No sendmsg (Windows)
+        return
+
+    views = [memoryview(b) for b in buffers if len(b)]
+    while views:
+        sent = sock.sendmsg(views, (), flags)
+        # Drop what went out; a partial send resumes mid-buffer
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def recv_message(sock):
+    """
+    Receive a length-prefixed JSON message
+
+    Args:
+        sock: BufferedSocket connection
 
     Returns:
-        Bytes received, or None if connection closed
+        Dictionary parsed from JSON, or None if connection closed
     """
-    data = b''
-    while len(data) < n:
-        chunk = sock.recv(n - len(data))
-        if not chunk:
+    # Parse straight from the read buffer, receiving only when it doesn't
+    # already hold the whole message
+    while not sock.has_message():
+        if not sock.fill():
             return None
-        data += chunk
-    return data
+    payload = sock.take_message()
+    return decode_json(payload) if payload else None
 
 
-def send_file(sock, filename, filepath):
+def send_file(sock, filename, filepath, chunk_size=CHUNK_SIZE, preamble=b''):
     """
     Send a file over the socket with metadata
 
+    Nothing is sent until the file has been opened, so a missing file
+    raises FileNotFoundError with the connection still in a clean state.
+
     Args:
         sock: Socket connection
         filename: Name of the file
         filepath: Path to the file to send
+        chunk_size: Bytes per read/send call when copying (sendfile moves as much as it can)
+        preamble: Encoded messages to send ahead of the metadata in the same syscall
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        EOFError: If the file shrank while sending (the connection is then
+            out of step with the advertised size and must be closed)
+    """
+    with open(filepath, 'rb', buffering=0) as f:
+        send_open_file(sock, filename, f, chunk_size, preamble)
+
+
+def send_open_file(sock, filename, f, chunk_size=CHUNK_SIZE, preamble=b'', drop_cache=True):
+    """
+    Send an already open file over the socket with metadata
+
+    Regular files are read at explicit offsets rather than through the
+    shared file position (where the platform supports it), so several
+    threads may send the same open file at once.
+
+    Args:
+        sock: Socket connection
+        filename: Name of the file
+        f: File object opened for binary reading (left open)
+        chunk_size: Bytes per read/send call when copying (sendfile moves as much as it can)
+        preamble: Encoded messages to send ahead of the metadata in the same syscall
+        drop_cache: Drop a large file's pages from the page cache afterwards
+            (pass False when other transfers may share f; see drop_cached_pages)
+
+    Raises:
+        EOFError: If the file shrank while sending (the connection is then
+            out of step with the advertised size and must be closed)
     """
-    # 1. Send file metadata
-    file_size = os.path.getsize(filepath)
-    send_message(sock, {
+    # 1. Send file metadata (size from the open file, so it matches what is sent)
+    st = os.fstat(f.fileno())
+    file_size = st.st_size
+    metadata = encode_message({
         "type": "file_transfer_start",
         "filename": filename,
         "size": file_size
     })
+    send_buffers(sock, [preamble, metadata], SEND_MORE if file_size else 0)
 
-    # 2. Send file data in chunks
-    bytes_sent = 0
-    with open(filepath, 'rb') as f:
-        while True:
-            chunk = f.read(4096)
-            if not chunk:
-                break
-            sock.sendall(chunk)
-            bytes_sent += len(chunk)
+    if not file_size:
+        return
 
-    # 3. Send completion message
-    send_message(sock, {
-        "type": "file_transfer_complete",
-        "bytes_sent": bytes_sent
-    })
+    # 2. Send file data (sendfile(2) copies page cache straight to the socket,
+    #    no Python buffers; regular files and plain TCP sockets only)
+    if not stat.S_ISREG(st.st_mode):
+        send_chunks(sock, f, file_size, chunk_size)
+        return
+
+    if hasattr(os, 'posix_fadvise'):
+        # Have the kernel start reading the whole file ahead of the sends
+        os.posix_fadvise(f.fileno(), 0, file_size, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(f.fileno(), 0, file_size, os.POSIX_FADV_WILLNEED)
+
+    offset = 0
+    try:
+        while offset < file_size:
+            sent = os.sendfile(sock.fileno(), f.fileno(), offset, file_size - offset)
+            if not sent:
+                raise EOFError("File shrank while sending")
+            offset += sent
+    except ConnectionError:
+        raise
+    except (AttributeError, OSError):
+        # No sendfile(2) on this platform/file, send from a memory map
+        # (or copy through a buffer if the file can't be mapped)
+        try:
+            mm = mmap.mmap(f.fileno(), file_size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            send_chunks(sock, f, file_size - offset, chunk_size, offset)
+        else:
+            send_mapped(sock, mm, offset, file_size - offset, chunk_size)
+    finally:
+        if drop_cache:
+            drop_cached_pages(f, file_size)
+
+
+def drop_cached_pages(f, file_size=None):
+    """
+    Drop a sent file's pages from the page cache if it is NOCACHE_SIZE or larger
+
+    Only call once no other transfer is reading the file, or its pages
+    would be dropped from under it.
+
+    Args:
+        f: Open file object
+        file_size: Size of the file (looked up if not given)
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    if file_size is None:
+        file_size = os.fstat(f.fileno()).st_size
+    if file_size >= NOCACHE_SIZE:
+        os.posix_fadvise(f.fileno(), 0, file_size, os.POSIX_FADV_DONTNEED)
+
+
+def send_mapped(sock, mm, offset, count, chunk_size=CHUNK_SIZE):
+    """
+    Send file data from a read-only memory map (fallback when sendfile fails)
 
+    The socket copies straight from the page cache, with no read() into a
+    Python buffer first.
 
-def recv_file(sock, filepath):
+    Args:
+        sock: Socket connection
+        mm: Memory map of the file (closed when done)
+        offset: Position of the first byte to send
+        count: Number of bytes to send
+        chunk_size: Bytes per send call
+    """
+    with mm, memoryview(mm) as view:
+        end = offset + count
+        while offset < end:
+            sock.sendall(view[offset:min(offset + chunk_size, end)])
+            offset += chunk_size
+
+
+def send_chunks(sock, f, count, chunk_size=CHUNK_SIZE, offset=None):
+    """
+    Copy file data to the socket in chunks (fallback when sendfile fails)
+
+    Args:
+        sock: Socket connection
+        f: File object to read from
+        count: Number of bytes to send
+        chunk_size: Bytes per read/send call
+        offset: Position of the first byte to send, or None to read from
+            the current file position
+
+    Raises:
+        EOFError: If the file ends before count bytes were sent
+    """
+    positional = offset is not None and hasattr(os, 'preadv')
+    if offset is not None and not positional:
+        f.seek(offset)  # No positional reads on this platform
+
+    buf = get_transfer_buffer(chunk_size)[:chunk_size]
+    while count > 0:
+        view = buf[:min(len(buf), count)]
+        if positional:
+            nread = os.preadv(f.fileno(), [view], offset)
+            offset += nread
+        else:
+            nread = f.readinto(view)
+        if not nread:
+            raise EOFError("File shrank while sending")
+        sock.sendall(buf[:nread])
+        count -= nread
+
+
+def recv_file(sock, filepath, dir_fd=None, chunk_size=CHUNK_SIZE):
     """
     Receive a file over the socket
 
+    The data goes into a temporary file that only replaces filepath once
+    the whole file has arrived, so readers never see a partial file.
+
     Args:
         sock: Socket connection
         filepath: Path where to save the file
+        dir_fd: Optional open directory descriptor that filepath is relative to
+        chunk_size: Bytes per recv call
 
     Returns:
         Dictionary with file metadata, or None if failed
@@ -128,22 +456,115 @@ def recv_file(sock, filepath):
     file_size = metadata["size"]
     filename = metadata["filename"]
 
-    # 2. Receive file data
-    bytes_received = 0
-    with open(filepath, 'wb') as f:
-        while bytes_received < file_size:
-            chunk_size = min(4096, file_size - bytes_received)
-            chunk = recv_exact(sock, chunk_size)
-            if not chunk:
-                return None
-            f.write(chunk)
-            bytes_received += len(chunk)
-
-    # 3. Receive completion message
-    completion = recv_message(sock)
+    # 2. Receive file data into a temporary file, then atomically rename it
+    #    into place (a failed transfer leaves any existing file untouched)
+    fd, temp_path = open_temp_file(filepath, dir_fd)
+    try:
+        try:
+            bytes_received = recv_into_file(sock, fd, file_size, chunk_size)
+        finally:
+            os.close(fd)
+        if bytes_received < file_size:
+            return None
+        os.replace(temp_path, filepath, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+        temp_path = None
+    finally:
+        if temp_path is not None:
+            os.unlink(temp_path, dir_fd=dir_fd)  # Discard a failed transfer
 
     return {
         "filename": filename,
         "size": file_size,
         "bytes_received": bytes_received
     }
+
+
+def is_temp_file(name):
+    """Check if a directory entry is an in-progress transfer from recv_file"""
+    return name.startswith('.') and name.endswith(TEMP_SUFFIX)
+
+
+def open_temp_file(filepath, dir_fd=None):
+    """
+    Create a hidden, uniquely named temporary file next to filepath
+
+    Args:
+        filepath: Final path of the file
+        dir_fd: Optional open directory descriptor that filepath is relative to
+
+    Returns:
+        Tuple of (file descriptor, temp path)
+    """
+    directory, name = os.path.split(filepath)
+    temp_path = os.path.join(directory, f".{name}.{os.urandom(4).hex()}{TEMP_SUFFIX}")
+    fd = os.open(temp_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666, dir_fd=dir_fd)
+    return fd, temp_path
+
+
+def recv_into_file(sock, fd, file_size, chunk_size=CHUNK_SIZE):
+    """
+    Receive file data directly into a memory map of an open file
+
+    Args:
+        sock: Socket connection
+        fd: File descriptor opened for reading and writing
+        file_size: Number of bytes to receive
+        chunk_size: Bytes per recv call
+
+    Returns:
+        Number of bytes received (less than file_size if connection closed)
+    """
+    if not file_size:
+        return 0  # Nothing to map
+
+    # Reserve the file's blocks up front (also sizes the file for the map)
+    try:
+        os.posix_fallocate(fd, 0, file_size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, file_size)
+
+    try:
+        mm = mmap.mmap(fd, file_size)
+    except (OSError, ValueError):
+        # Filesystem can't map files (or the file won't fit in the address space)
+        return recv_chunks(sock, fd, file_size, chunk_size)
+
+    bytes_received = 0
+    with mm, memoryview(mm) as view:
+        while bytes_received < file_size:
+            want = min(chunk_size, file_size - bytes_received)
+            # Release each slice at once: one still referenced by a failed
+            # recv's traceback would make closing the map raise BufferError
+            # in place of the real error
+            with view[bytes_received:bytes_received + want] as chunk:
+                nread = sock.recv_into(chunk, want, RECV_FLAGS)
+            if not nread:
+                break
+            bytes_received += nread
+    return bytes_received
+
+
+def recv_chunks(sock, fd, file_size, chunk_size=CHUNK_SIZE):
+    """
+    Receive file data through the thread's buffer (fallback when mmap fails)
+
+    Args:
+        sock: Socket connection
+        fd: File descriptor opened for writing, positioned at the start
+        file_size: Number of bytes to receive
+        chunk_size: Bytes per recv call
+
+    Returns:
+        Number of bytes received (less than file_size if connection closed)
+    """
+    buf = get_transfer_buffer(chunk_size)[:chunk_size]
+    bytes_received = 0
+    while bytes_received < file_size:
+        nread = sock.recv_into(buf, min(chunk_size, file_size - bytes_received), RECV_FLAGS)
+        if not nread:
+            break
+        written = 0
+        while written < nread:
+            written += os.write(fd, buf[written:nread])
+        bytes_received += nread
+    return bytes_received
@@ -14,12 +14,26 @@ Protocol:
 """
 
 import os
+import re
+import sys
 import socket
+import collections
 import protocol
 import threading
+import selectors
+import time
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import queue
 import logging
+import logging.handlers
 from datetime import datetime
 
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
 #configure logging
 LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
 if not os.path.exists(LOG_DIR):
@@ -29,69 +43,263 @@ if not os.path.exists(LOG_DIR):
 log_filename = os.path.join(LOG_DIR, f'ftp_server_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
 
 # Configure logging format
+log_handlers = [
+    logging.FileHandler(log_filename),
+    logging.StreamHandler()
+]
+log_formatter = logging.Formatter('%(asctime)s - [%(threadName)s] - %(levelname)s - %(message)s')
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+
+# Client threads only enqueue log records; a background listener thread
+# formats them and does the file/console writes
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush queued records on exit
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves all formatting to the listener thread
+
+    The stock QueueHandler formats each record before queueing it (so it
+    could be pickled); the queue here never leaves the process, so records
+    are queued as-is and their "%s" arguments are only merged in the
+    background.
+    """
+
+    def prepare(self, record):
+        return record
+
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - [%(threadName)s] - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_filename),
-        logging.StreamHandler()
-    ]
+    handlers=[LogQueueHandler(log_queue)]
 )
 
 logger = logging.getLogger(__name__)
 
 SERVER_FILE_DIR = os.path.join(os.path.dirname(__file__), 'server_files')
+DIR_PREFIX = SERVER_FILE_DIR + os.sep
+
+# A plain name inside the server directory: no path separators or NUL, and
+# no leading dot (rules out "..", hidden files and in-progress transfers)
+SAFE_FILENAME = re.compile(r'[^./\\\0][^/\\\0]*')
+
+# Open the server directory once; PUTs then create files relative to it
+# instead of resolving the full path each time (platforms with dir_fd support)
+DIR_FD = os.open(SERVER_FILE_DIR, os.O_RDONLY) if os.open in os.supports_dir_fd else None
+
 IP = '127.0.0.1'
 PORT = 5000
+CHUNK_SIZE = 64 * 1024  # Bytes per file read/recv call on transfers
+# Commands executed at once. Workers mostly sit blocked in socket and file
+# I/O with the GIL released (a GET to a slow client holds its worker for
+# the whole transfer), so allow far more workers than cores
+MAX_WORKERS = max(32, (os.cpu_count() or 1) * 4)
+OPEN_FILES_TARGET = 65536  # Open-file limit to aim for when the hard limit is unlimited
+ACCEPT_BATCH = 64  # Connections accepted per wakeup before serving other events
+
+# Cores this process may run on (respects taskset/container CPU limits)
+LOOP_CORES = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_setaffinity") else []
+
+# Linux balances incoming connections across SO_REUSEPORT sockets, so each
+# event loop thread gets its own listening socket and kernel accept queue
+REUSE_PORT = sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+LOOP_THREADS = max(1, len(LOOP_CORES)) if REUSE_PORT else 1
+
+# Pin each event loop thread to its own core, so a connection's reads stay on
+# one core (Linux only; pair with NIC IRQ affinity, see README)
+PIN_LOOPS = len(LOOP_CORES) > 1
+
+# Linux only: ACK received data immediately instead of waiting out the
+# delayed-ACK timer (the kernel clears the flag, so it is set per receive)
+QUICKACK = hasattr(socket, "TCP_QUICKACK")
+
+# Linux copies the listener's TCP_NODELAY and buffer sizes to accepted
+# sockets; elsewhere that isn't guaranteed, so set them on each connection
+INHERITS_SOCKET_OPTIONS = sys.platform.startswith("linux")
+
+# Cached directory listing, rebuilt only when the directory's mtime changes:
+# a set for lookups and a sorted list for LS
+file_cache = {"mtime": None, "files": frozenset(), "names": []}
+file_cache_lock = threading.Lock()
+
+
+def refresh_file_cache():
+    """
+    Rescan the server directory if it changed since the last scan
+
+    Returns:
+        Tuple of (set of file names, sorted list of file names); shared, don't modify
+    """
+    mtime = os.stat(SERVER_FILE_DIR).st_mtime_ns
+    with file_cache_lock:
+        # A listing taken in the same second as a change may have missed it
+        # (coarse filesystem timestamps), so keep rescanning until it settles
+        if mtime != file_cache["mtime"] or time.time_ns() - mtime < 1_000_000_000:
+            # scandir() reports each entry's type from the directory read
+            # itself, so regular files are picked out without a stat per name
+            with os.scandir(SERVER_FILE_DIR) as entries:
+                names = sorted(
+                    entry.name for entry in entries
+                    if entry.is_file() and not protocol.is_temp_file(entry.name)
+                )
+            forget_open_files()  # Files may have been replaced or deleted
+            if names != file_cache["names"]:  # Same names keep their cached LS response
+                file_cache["files"] = frozenset(names)
+                file_cache["names"] = names
+            file_cache["mtime"] = mtime
+        return file_cache["files"], file_cache["names"]
+
+
+def get_file_set():
+    """Get set of files in server directory (cached until the directory changes)"""
+    return refresh_file_cache()[0]
+
 
-COMMANDS = ["LS", "GET", "PUT", "QUIT"]
+def get_file_list():
+    """Get sorted list of files in server directory (cached, don't modify)"""
+    return refresh_file_cache()[1]
 
-def validate_command(command):
-    response_code = 200
-    response = "OK"
 
-    if command not in COMMANDS:
-        response = f"Invalid Command, command: \"{command}\" unknown. "
-        response_code = 400
+# Encoded LS response, rebuilt when the cached listing changes
+ls_cache = {"names": None, "response": b""}
+ls_cache_lock = threading.Lock()
 
-    return response_code, response  
 
-def get_file_list():
-    """Get list of files in server directory"""
-    return os.listdir(SERVER_FILE_DIR)
+def get_ls_response():
+    """
+    Get the encoded LS response for the current directory listing
+
+    Returns:
+        Tuple of (response bytes ready to send, number of files)
+    """
+    names = get_file_list()
+    with ls_cache_lock:
+        if ls_cache["names"] is not names:
+            ls_cache["response"] = protocol.encode_message({
+                "type": "response",
+                "code": 200,
+                "message": "OK",
+                "data": {"files": names}
+            })
+            ls_cache["names"] = names
+        return ls_cache["response"], len(names)
 
 
 def file_exists(filename):
     """Check if file exists in server directory"""
-    return filename in get_file_list()
+    return filename in get_file_set()
 
 
-def get_file_path(filename):
-    """Get full path to file in server directory"""
-    return os.path.join(SERVER_FILE_DIR, filename)
+def is_valid_filename(filename):
+    """Check that a client-supplied filename names a file inside the server directory"""
+    return isinstance(filename, str) and SAFE_FILENAME.fullmatch(filename) is not None
 
 
-def handle_ls(connection):
+def get_file_path(filename):
+    """Get full path to file in server directory (filename must be valid)"""
+    return DIR_PREFIX + filename
+
+
+# Recently sent files kept open (least recently used first), so a GET of a
+# hot file skips the open()/close() and path lookup. Entries are shared by
+# concurrent GETs and only closed once no transfer is using them. Not on
+# Windows: there a PUT can't rename its upload over a file held open.
+OPEN_FILES_MAX = 128 if os.name != "nt" else 0
+open_files = collections.OrderedDict()  # filename -> {"file", "users", "cached"}
+open_files_lock = threading.Lock()
+
+
+def acquire_open_file(filename):
+    """
+    Get a shared read-only file object for a server file (see release_open_file)
+
+    Returns:
+        Cache entry; entry["file"] is the open file
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    with open_files_lock:
+        entry = open_files.get(filename)
+        if entry is not None:
+            open_files.move_to_end(filename)
+            entry["users"] += 1
+            return entry
+
+    f = open(get_file_path(filename), 'rb', buffering=0)
+    entry = {"file": f, "users": 1, "cached": OPEN_FILES_MAX > 0}
+    if not entry["cached"]:
+        return entry  # Closed by release_open_file
+    with open_files_lock:
+        other = open_files.get(filename)
+        if other is not None:
+            # Another thread opened it meanwhile; share theirs
+            other["users"] += 1
+            f.close()
+            return other
+        open_files[filename] = entry
+        while len(open_files) > OPEN_FILES_MAX:
+            evict_open_file(open_files.popitem(last=False)[1])
+    return entry
+
+
+def release_open_file(entry):
+    """Finish using an entry from acquire_open_file"""
+    with open_files_lock:
+        if entry["users"] > 1:
+            entry["users"] -= 1
+            return
+
+    # Last transfer of a shared file: only now is it safe to drop its pages.
+    # Done outside the lock (it can take a while for a big file) while still
+    # counted as a user, so an eviction meanwhile can't close the file.
+    protocol.drop_cached_pages(entry["file"])
+
+    with open_files_lock:
+        entry["users"] -= 1
+        close = not entry["users"] and not entry["cached"]
+    if close:
+        entry["file"].close()  # Evicted and unused; no one else can reach it
+
+
+def evict_open_file(entry):
+    """Drop an entry from the cache, closing it unless a transfer still uses it (lock held)"""
+    entry["cached"] = False
+    if not entry["users"]:
+        entry["file"].close()
+
+
+def forget_open_files(filename=None):
+    """Drop cached open files (one name, or all) after the directory changed"""
+    with open_files_lock:
+        if filename is None:
+            while open_files:
+                evict_open_file(open_files.popitem()[1])
+        elif filename in open_files:
+            evict_open_file(open_files.pop(filename))
+
+
+def handle_ls(connection, filename=None):
     """Handle LS command - list all files"""
-    file_list = get_file_list()
-    protocol.send_message(connection, {
-        "type": "response",
-        "code": 200,
-        "message": "OK",
-        "data": {"files": file_list}
-    })
-    logger.info(f"LS: Sent {len(file_list)} files")
+    response, file_count = get_ls_response()
+    connection.sendall(response)
+    logger.info("LS: Sent %d files", file_count)
+    return True
 
 
 def handle_get(connection, filename):
     """Handle GET command - send file to client"""
-    if not filename:
+    if not is_valid_filename(filename):
         protocol.send_message(connection, {
             "type": "response",
             "code": 400,
-            "message": "Bad Request: filename required"
+            "message": "Bad Request: valid filename required"
         })
-        return
+        return True
 
     if not file_exists(filename):
         protocol.send_message(connection, {
@@ -99,31 +307,46 @@ def handle_get(connection, filename):
             "code": 404,
             "message": f"File Not Found: {filename}"
         })
-        logger.warning(f"GET: File not found - {filename}")
-        return
+        logger.warning("GET: File not found - %s", filename)
+        return True
 
-    # Send success response
-    protocol.send_message(connection, {
+    # Send the success response and the file; the response goes out in the
+    # same syscall as the file metadata
+    response = protocol.encode_message({
         "type": "response",
         "code": 200,
         "message": "OK"
     })
-
-    # Send the file
-    filepath = get_file_path(filename)
-    protocol.send_file(connection, filename, filepath)
-    logger.info(f"GET: Sent file - {filename}")
+    try:
+        entry = acquire_open_file(filename)
+    except FileNotFoundError:
+        # Deleted since the listing was cached; nothing has been sent yet
+        protocol.send_message(connection, {
+            "type": "response",
+            "code": 404,
+            "message": f"File Not Found: {filename}"
+        })
+        logger.warning("GET: File not found - %s", filename)
+        return True
+    try:
+        # Shared with other GETs: release_open_file drops the pages once all are done
+        protocol.send_open_file(connection, filename, entry["file"], chunk_size=CHUNK_SIZE,
+                                preamble=response, drop_cache=False)
+    finally:
+        release_open_file(entry)
+    logger.info("GET: Sent file - %s", filename)
+    return True
 
 
 def handle_put(connection, filename):
     """Handle PUT command - receive file from client"""
-    if not filename:
+    if not is_valid_filename(filename):
         protocol.send_message(connection, {
             "type": "response",
             "code": 400,
-            "message": "Bad Request: filename required"
+            "message": "Bad Request: valid filename required"
         })
-        return
+        return True
 
     # Send ready response
     protocol.send_message(connection, {
@@ -133,116 +356,349 @@ def handle_put(connection, filename):
     })
 
     # Receive the file
-    filepath = get_file_path(filename)
-    result = protocol.recv_file(connection, filepath)
+    if DIR_FD is not None:
+        result = protocol.recv_file(connection, filename, dir_fd=DIR_FD, chunk_size=CHUNK_SIZE)
+    else:
+        result = protocol.recv_file(connection, get_file_path(filename), chunk_size=CHUNK_SIZE)
 
     if result:
-        logger.info(f"PUT: Received file - {filename} ({result['bytes_received']} bytes)")
+        forget_open_files(filename)  # GETs must not keep sending the replaced file
+        logger.info("PUT: Received file - %s (%d bytes)", filename, result['bytes_received'])
     else:
-        logger.error(f"PUT: Failed to receive file - {filename}")
+        logger.error("PUT: Failed to receive file - %s", filename)
+    return True
+
+
+def handle_quit(connection, filename=None):
+    """Handle QUIT command - say goodbye and end the session"""
+    protocol.send_message(connection, {
+        "type": "response",
+        "code": 200,
+        "message": "Goodbye"
+    })
+    return False
+
 
-def handle_client(connection, address):
-    """Handle a single client connection in a separate thread"""
+# Command dispatch table; each handler returns False when the session should end
+HANDLERS = {
+    "LS": handle_ls,
+    "GET": handle_get,
+    "PUT": handle_put,
+    "QUIT": handle_quit
+}
+
+# Reply to commands with no handler (encoded once, it never changes)
+BAD_COMMAND_RESPONSE = protocol.encode_message({
+    "type": "response",
+    "code": 400,
+    "message": "Invalid Command"
+})
+
+
+def pin_thread(core):
+    """Pin the calling thread to one CPU core"""
     try:
-        logger.info(f"New connection from {address}")
+        os.sched_setaffinity(0, {core})
+    except OSError as e:
+        logger.warning("Could not pin thread to core %d: %s", core, e)
 
-        # Send connection acknowledgment
-        protocol.send_message(connection, {
-            "type": "connection",
-            "code": 200,
-            "message": "Connection established"
-        })
 
-        # Handle client commands
-        while True:
-            # Receive command message
-            msg = protocol.recv_message(connection)
-            if not msg:
-                logger.info(f"Client {address} disconnected")
-                break
-
-            # Parse command
-            msg_type = msg.get("type")
-            if msg_type != "command":
-                logger.warning(f"Unknown message type from {address}: {msg_type}")
-                continue
-
-            client_command = msg.get("command", "").upper()
-            filename = msg.get("filename")
-
-            logger.info(f"{address} - Command: {client_command}" +
-                       (f" {filename}" if filename else ""))
-
-            # Validate command
-            response_code, response_msg = validate_command(client_command)
-
-            if response_code != 200:
-                # Invalid command
-                logger.warning(f"{address} - Invalid command: {client_command}")
-                protocol.send_message(connection, {
-                    "type": "response",
-                    "code": response_code,
-                    "message": response_msg
-                })
-                continue
-
-            # Execute command
-            if client_command == "LS":
-                handle_ls(connection)
-
-            elif client_command == "GET":
-                handle_get(connection, filename)
-
-            elif client_command == "PUT":
-                handle_put(connection, filename)
-
-            elif client_command == "QUIT":
-                protocol.send_message(connection, {
-                    "type": "response",
-                    "code": 200,
-                    "message": "Goodbye"
-                })
-                logger.info(f"Client {address} requested disconnect")
-                break
-
-    except Exception as e:
-        logger.error(f"Error handling client {address}: {e}")
+def unpin_thread():
+    """Let the calling thread run on any core again (new threads inherit their creator's pinning)"""
+    if PIN_LOOPS:
+        os.sched_setaffinity(0, LOOP_CORES)
+
+
+# Open client connections, so shutdown can unblock workers serving them
+active_connections = set()
+active_connections_lock = threading.Lock()
+
+
+def open_session(connection, address):
+    """Set up a newly accepted client connection and acknowledge it"""
+    with active_connections_lock:
+        active_connections.add(connection)
+    logger.info("New connection from %s", address)
+
+    # Send connection acknowledgment
+    protocol.send_message(connection, {
+        "type": "connection",
+        "code": 200,
+        "message": "Connection established"
+    })
+
+
+def close_session(connection, address):
+    """Close a client connection"""
+    with active_connections_lock:
+        active_connections.discard(connection)
+    connection.close()
+    logger.info("Connection closed for %s", address)
+
+
+def handle_command(connection, address):
+    """
+    Handle one command from a client whose message is already buffered
+
+    Returns:
+        True to keep the connection open, False to close it
+    """
+    # Receive command message
+    msg = protocol.recv_message(connection)
+    if not msg:
+        logger.info("Client %s disconnected", address)
+        return False
+    if QUICKACK:
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    # Parse command
+    msg_type = msg.get("type")
+    if msg_type != "command":
+        logger.warning("Unknown message type from %s: %s", address, msg_type)
+        return True
+
+    client_command = msg.get("command")
+    filename = msg.get("filename")
+
+    logger.info("%s - Command: %s %s", address, client_command, filename or "")
+
+    # Look up the handler (unknown commands have none)
+    handler = HANDLERS.get(client_command)
+    if handler is None:
+        logger.warning("%s - Invalid command: %s", address, client_command)
+        connection.sendall(BAD_COMMAND_RESPONSE)
+        return True
+
+    # Execute command
+    if not handler(connection, filename):
+        logger.info("Client %s requested disconnect", address)
+        return False
+    return True
+
+
+def close_active_connections():
+    """Shut down all client connections so their worker threads can exit"""
+    with active_connections_lock:
+        connections = list(active_connections)
+    for connection in connections:
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def check_port_free():
+    """
+    Bind IP:PORT once without SO_REUSEPORT, so a port already held by another
+    server fails with EADDRINUSE instead of being shared with it
+
+    Raises:
+        OSError: If the port is in use
+    """
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        probe.bind((IP, PORT))
     finally:
-        connection.close()
-        logger.info(f"Connection closed for {address}")
+        probe.close()
 
-def serve():
-    """Main server loop - accepts connections and spawns threads"""
+
+def create_listener(reuse_port=False):
+    """
+    Create a listening socket bound to IP:PORT
+
+    Args:
+        reuse_port: Set SO_REUSEPORT so sibling listeners can share the port
+    """
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Allow port reuse
+    if reuse_port:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    protocol.configure_socket(server)
     server.bind((IP, PORT))
-    server.listen(5)  # Increased from 1 to 5 for multiple connections
+    server.listen(socket.SOMAXCONN)  # Large backlog so bursts of clients aren't dropped
+    return server
+
+
+class EventLoop:
+    """
+    Selector loop for one listening socket and its idle client connections
+
+    Idle connections cost no thread: the loop reads from them as data
+    arrives, and only once a whole command is buffered is the connection
+    handed to the worker pool. The worker runs the command with the normal
+    blocking protocol helpers, then gives the connection back to the loop.
+    """
+
+    def __init__(self, listener, executor):
+        self.listener = listener
+        self.executor = executor
+        self.selector = selectors.DefaultSelector()
+        listener.setblocking(False)  # accept() drains the queue until it would block
+        self.selector.register(listener, selectors.EVENT_READ)
+
+        # Workers hand connections back through a queue + wakeup socket,
+        # since a selector may only be changed from its own thread
+        self.returned = queue.SimpleQueue()
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
+        self.wakeup_send.setblocking(False)
+        self.selector.register(self.wakeup_recv, selectors.EVENT_READ)
+
+    def run(self, core=None):
+        """Serve events until the listening socket is closed"""
+        if core is not None:
+            pin_thread(core)
+        while self.listener.fileno() != -1:
+            for key, _ in self.selector.select():
+                if key.fileobj is self.listener:
+                    self.accept()
+                elif key.fileobj is self.wakeup_recv:
+                    self.take_returned()
+                else:
+                    self.read(key.fileobj, key.data)
+
+    def accept(self):
+        """Accept the clients waiting in the listen queue (up to ACCEPT_BATCH)"""
+        for _ in range(ACCEPT_BATCH):
+            try:
+                sock, address = self.listener.accept()
+            except BlockingIOError:
+                return  # Queue drained
+            except OSError:
+                return  # Listening socket was closed during shutdown
+            # macOS/BSD copy the listener's O_NONBLOCK to accepted sockets;
+            # the worker-side helpers need blocking ones
+            sock.setblocking(True)
+            self.add_connection(sock, address)
+
+    def add_connection(self, sock, address):
+        """Start a session for an accepted client and watch it for commands"""
+        connection = protocol.BufferedSocket(sock)
+        try:
+            if not INHERITS_SOCKET_OPTIONS:
+                protocol.configure_socket(sock)
+            open_session(connection, address)
+        except OSError as e:
+            logger.error("Error handling client %s: %s", address, e)
+            close_session(connection, address)
+            return
+        self.selector.register(connection, selectors.EVENT_READ, address)
+
+    def read(self, connection, address):
+        """Buffer newly arrived data; dispatch once a whole command is in"""
+        try:
+            received = connection.drain()
+        except OSError:
+            received = 0
+        if not received:
+            self.selector.unregister(connection)
+            logger.info("Client %s disconnected", address)
+            close_session(connection, address)
+        elif connection.has_message():
+            self.selector.unregister(connection)
+            self.dispatch(connection, address)
+
+    def dispatch(self, connection, address):
+        """Run the buffered command on a worker thread"""
+        self.executor.submit(self.run_command, connection, address)
+
+    def run_command(self, connection, address):
+        """Worker thread: execute one command, then return the connection"""
+        try:
+            keep_open = handle_command(connection, address)
+        except Exception as e:
+            logger.error("Error handling client %s: %s", address, e)
+            keep_open = False
+
+        if not keep_open:
+            close_session(connection, address)
+            return
+        self.returned.put((connection, address))
+        try:
+            self.wakeup_send.send(b"\0")
+        except BlockingIOError:
+            pass  # Loop already has a wakeup pending
+
+    def take_returned(self):
+        """Resume watching connections that workers have finished with"""
+        try:
+            self.wakeup_recv.recv(4096)
+        except BlockingIOError:
+            pass
+        while not self.returned.empty():
+            connection, address = self.returned.get()
+            if connection.has_message():
+                self.dispatch(connection, address)  # Client sent its next command early
+            elif connection.fileno() != -1:
+                self.selector.register(connection, selectors.EVENT_READ, address)
+
+
+def raise_open_file_limit():
+    """
+    Raise the soft open-file limit as far as allowed (like `ulimit -n`)
+
+    Every client connection is a file descriptor, and the default soft limit
+    (often 1024) would otherwise cap the number of concurrent clients.
+
+    Returns:
+        The open-file limit now in effect, or None if unknown
+    """
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # An unlimited hard limit (the macOS default) can't be used as the soft
+    # limit, so aim for a finite target and halve it until the kernel agrees
+    target = hard if hard != resource.RLIM_INFINITY else OPEN_FILES_TARGET
+    while target > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            return target
+        except (ValueError, OSError):
+            target = min(target, OPEN_FILES_TARGET) // 2
+    return soft
 
-    logger.info(f"Multi-threaded FTP Server listening on {IP}:{PORT}")
-    logger.info(f"Server directory: {SERVER_FILE_DIR}")
-    logger.info(f"Logging to: {log_filename}")
-    logger.info("Ready to accept multiple concurrent connections...")
 
-    try:
-        while True:
-            # Wait for connection
-            connection, address = server.accept()
-
-            # Create and start a new thread for this client
-            client_thread = threading.Thread(
-                target=handle_client,
-                args=(connection, address),
-                name=f"Client-{address[0]}:{address[1]}"
-            )
-            client_thread.daemon = True  # Thread will close when main program exits
-            client_thread.start()
+def serve():
+    """Main server loop - event loops watch connections, a thread pool runs commands"""
+    file_limit = raise_open_file_limit()
+    reuse_port = LOOP_THREADS > 1
+    if reuse_port:
+        check_port_free()
+    listeners = [create_listener(reuse_port) for _ in range(LOOP_THREADS)]
+
+    logger.info("Multi-threaded FTP Server listening on %s:%d", IP, PORT)
+    logger.info("Server directory: %s", SERVER_FILE_DIR)
+    logger.info("Logging to: %s", log_filename)
+    logger.info("Open file limit: %s", file_limit if file_limit is not None else "unknown")
+    logger.info("Ready to accept connections (%d event loops, %d command workers)...",
+                LOOP_THREADS, MAX_WORKERS)
+
+    # Bounded pool of worker threads that execute commands
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="Client",
+                                  initializer=unpin_thread)
+    loops = [EventLoop(listener, executor) for listener in listeners]
+    cores = [LOOP_CORES[i % len(LOOP_CORES)] if PIN_LOOPS else None for i in range(len(loops))]
+
+    # Extra event loops get their own threads; the main thread runs the first
+    for i, loop in enumerate(loops[1:], start=1):
+        threading.Thread(
+            target=loop.run,
+            args=(cores[i],),
+            name=f"EventLoop-{i}",
+            daemon=True
+        ).start()
 
-            logger.info(f"Spawned thread {client_thread.name} for {address}")
+    try:
+        loops[0].run(cores[0])
 
     except KeyboardInterrupt:
         logger.info("Server shutting down...")
     finally:
-        server.close()
+        for listener in listeners:
+            listener.close()
+        close_active_connections()
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":